@@ -4,21 +4,53 @@ Cluely-Lite Local AI Agent Server
 A local HTTP server that provides AI-powered desktop automation using Ollama.
 """
 
+import hashlib
 import json
+import http.client
 import http.server
 import socketserver
 import os
-import textwrap
+import queue
+import re
+import socket
 import logging
+import threading
 import time
-from urllib.parse import urlparse
-from urllib import request, error as urllib_error
-import socket
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse, urlsplit
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used when it is not installed
+    orjson = None
 
 # Configuration (defaults favor small, efficient local models)
 DEFAULT_OLLAMA_URL = os.environ.get("CLUELY_OLLAMA_URL", "http://127.0.0.1:11434/api/generate")
 DEFAULT_OLLAMA_MODEL = os.environ.get("CLUELY_OLLAMA_MODEL", "qwen2.5:3b")
-ALLOWED_ACTIONS = {"answer", "click", "type", "focus"}
+# Upper bound on how long a handler thread may wait on a single generation call
+OLLAMA_TIMEOUT = float(os.environ.get("CLUELY_OLLAMA_TIMEOUT", "120"))
+ALLOWED_ACTIONS = frozenset({"answer", "click", "type", "focus"})
+# Snapshot limits for the planning prompt (keeps us inside num_ctx)
+MAX_SNAPSHOT_NODES = 120
+MAX_SNAPSHOT_BYTES = 60000
+# Largest request body accepted on POST; bigger bodies are rejected unread
+MAX_BODY_BYTES = int(os.environ.get("CLUELY_MAX_BODY_BYTES", str(1 << 20)))
+BODY_READ_CHUNK = 64 * 1024
+# How long Ollama keeps the model (and its prompt cache) loaded after a request
+OLLAMA_KEEP_ALIVE = os.environ.get("CLUELY_KEEP_ALIVE", "30m")
+# Always ask the model, even for commands the heuristic planner can resolve
+LLM_FIRST = bool(os.environ.get("CLUELY_LLM_FIRST"))
+# Opt-in SO_REUSEPORT so several server processes can share the listening port
+REUSE_PORT = bool(os.environ.get("CLUELY_REUSEPORT"))
+# Seconds an identical Ollama request is answered from cache (0 disables)
+RESPONSE_CACHE_TTL = float(os.environ.get("CLUELY_CACHE_TTL", "300"))
+# Connections are served by a fixed pool of worker threads
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Connections waiting for a worker beyond this are turned away with a 503
+MAX_PENDING = 64
+# Idle keep-alive connections are dropped after this many seconds so they
+# do not hold a worker that queued connections are waiting for
+KEEPALIVE_TIMEOUT = 15
 
 # Mutable server state (runtime configurable via /settings)
 server_state = {
@@ -31,18 +63,110 @@ log_level = logging.DEBUG if os.environ.get("CLUELY_DEBUG") else logging.INFO
 logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+def _dumps(obj, indent=False):
+    """Serialize obj to UTF-8 encoded JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    # Keep ensure_ascii on: stdlib json.loads lets lone surrogates through,
+    # and those cannot be encoded as UTF-8 but escape fine as \udXXX
+    if indent:
+        return json.dumps(obj, indent=2).encode('ascii')
+    return json.dumps(obj, separators=(',', ':')).encode('ascii')
+
+
+# Both accept bytes directly, so bodies are never decoded to str first.
+# orjson reports invalid UTF-8 as a JSONDecodeError (a json.JSONDecodeError
+# subclass); stdlib json raises UnicodeDecodeError instead.
+_loads = orjson.loads if orjson is not None else json.loads
+JSON_DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+
+
+class RequestCounter:
+    """Hands out request ids; ``value`` is how many have been issued so far.
+
+    The lock makes the increment safe without relying on the GIL and keeps
+    ``value`` from moving backwards when handlers race.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+
 # Global state
-request_count = 0
-start_time = time.time()
+request_counter = RequestCounter()
+start_time = time.monotonic()
+
+# Plain-text page served on / and /status; only the placeholders vary per hit
+_STATUS_PAGE = (
+    b"Cluely-Lite Agent Server\n"
+    b"Status: Running\n"
+    b"Uptime: %.1f seconds\n"
+    b"Requests: %d\n"
+    b"Ollama: %s at %s\n"
+    b"\n"
+    b'Use POST /command with JSON {"instruction":"<text>","snapshot":[...]}\n'
+)
+
+# Compact /health body; must stay in step with the dict do_GET builds for ?pretty=1
+_HEALTH_TEMPLATE = (
+    b'{"status":"running","uptime_seconds":%.2f,"requests_processed":%d,'
+    b'"ollama_url":%s,"ollama_model":%s,"version":"1.0.0"}'
+)
+
+
+def _encode_settings(url, model):
+    """Return the byte pairs spliced into _HEALTH_TEMPLATE and _STATUS_PAGE.
+
+    Raises ValueError (or TypeError from orjson) when a value is not valid text.
+    """
+    return (_dumps(url), _dumps(model)), (model.encode('utf-8'), url.encode('utf-8'))
+
+
+def _apply_settings(updated):
+    """Apply new runtime settings, encoding them first so a bad value changes nothing."""
+    global _settings_json, _settings_text
+    new_state = {**server_state, **updated}
+    encoded_json, encoded_text = _encode_settings(new_state["ollama_url"], new_state["ollama_model"])
+    server_state.update(updated)
+    _settings_json, _settings_text = encoded_json, encoded_text
+
+
+# Replaced together with server_state by _apply_settings()
+_settings_json, _settings_text = _encode_settings(server_state["ollama_url"], server_state["ollama_model"])
 
 
 class CommandHandler(http.server.BaseHTTPRequestHandler):
     protocol_version = "HTTP/1.1"
+    # Buffer writes so status line, headers and body go out in a single send;
+    # handle_one_request() flushes once the handler method returns
+    wbufsize = 64 * 1024
+    timeout = KEEPALIVE_TIMEOUT
+
+    def setup(self):
+        super().setup()
+        # Responses are small; don't let Nagle's algorithm hold them back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle_expect_100(self):
+        ok = super().handle_expect_100()
+        # The interim 100 Continue must reach the client before we wait on the body
+        self.wfile.flush()
+        return ok
 
     def do_POST(self):
         """Handle POST requests to /command endpoint or /settings."""
-        global request_count
-        request_count += 1
+        request_id = request_counter.next()
 
         parsed_path = urlparse(self.path)
         if parsed_path.path not in ('/command', '/settings'):
@@ -58,36 +182,51 @@ class CommandHandler(http.server.BaseHTTPRequestHandler):
         except (TypeError, ValueError):
             self._send_error(400, "Invalid Content-Length header")
             return
+        if content_length < 0:
+            self._send_error(400, "Invalid Content-Length header")
+            return
+        if content_length > MAX_BODY_BYTES:
+            # The body is left unread, so this connection cannot be reused
+            self.close_connection = True
+            self._send_error(413, "Payload too large")
+            return
 
         try:
-            post_data = self.rfile.read(content_length)
+            post_data = self._read_body(content_length)
         except OSError as exc:
             self._send_error(400, f"Failed to read request body: {exc}")
             return
 
         try:
-            json_payload = json.loads(post_data.decode('utf-8'))
-        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            json_payload = _loads(post_data)
+        except JSON_DECODE_ERRORS as exc:
             self._send_error(400, f"Invalid JSON payload: {exc}")
             return
 
         if parsed_path.path == '/settings':
-            # Runtime settings update
+            # Runtime settings update; validate everything before applying any of it
             updated = {}
-            if 'ollama_url' in json_payload:
-                url = str(json_payload['ollama_url']).strip()
-                if url:
-                    server_state['ollama_url'] = url
-                    updated['ollama_url'] = url
-            if 'ollama_model' in json_payload:
-                model = str(json_payload['ollama_model']).strip()
-                if model:
-                    server_state['ollama_model'] = model
-                    updated['ollama_model'] = model
+            for field in ('ollama_url', 'ollama_model'):
+                if field in json_payload:
+                    value = str(json_payload[field]).strip()
+                    if value:
+                        updated[field] = value
             if not updated:
                 self._send_error(400, "No recognized settings in payload")
                 return
-            logger.info(f"Settings updated: {updated}")
+            try:
+                _apply_settings(updated)
+            except (TypeError, ValueError):
+                self._send_error(400, "Settings must be valid UTF-8 text")
+                return
+            if 'ollama_url' in updated:
+                # Failures against the previous endpoint say nothing about this one
+                _record_ollama_result(True)
+                ollama_pool.close_idle()
+                invalidate_ollama_probes()
+            # A different daemon may serve different weights under the same name
+            response_cache.clear()
+            logger.info("Settings updated: %s", updated)
             self._send_json(200, {"status": "ok", **server_state})
             return
 
@@ -100,19 +239,22 @@ class CommandHandler(http.server.BaseHTTPRequestHandler):
         req_model = json_payload.get('model')
         model_override = str(req_model).strip() if isinstance(req_model, str) and req_model.strip() else None
 
-        logger.info(f"Generating for request #{request_count}: {instruction[:50]}...")
-        request_started = time.time()
+        # ?no_cache=1 forces a fresh generation for this request
+        use_cache = parse_qs(parsed_path.query).get('no_cache') != ['1']
+
+        logger.info("Generating for request #%d: %.50s...", request_id, instruction)
+        request_started = time.monotonic()
 
         try:
-            text, gen_err = generate_text(instruction.strip(), model_override=model_override)
-            processing_time = time.time() - request_started
-            logger.info(f"Request #{request_count} completed in {processing_time:.2f}s")
+            text, gen_err = generate_text(instruction.strip(), model_override=model_override, use_cache=use_cache)
+            processing_time = time.monotonic() - request_started
+            logger.info("Request #%d completed in %.2fs", request_id, processing_time)
             if gen_err:
                 self._send_json(502, {"response": f"Error: {gen_err}"})
             else:
                 self._send_json(200, {"response": text})
         except Exception as e:
-            logger.error(f"Error processing request #{request_count}: {e}")
+            logger.error("Error processing request #%d: %s", request_id, e)
             self._send_json(500, {"response": f"Error processing request: {str(e)}"})
     
     def do_GET(self):
@@ -122,43 +264,52 @@ class CommandHandler(http.server.BaseHTTPRequestHandler):
             self._send_error(404, "Not found")
             return
         
-        uptime = time.time() - start_time
-        status = {
-            "status": "running",
-            "uptime_seconds": round(uptime, 2),
-            "requests_processed": request_count,
-            "ollama_url": server_state["ollama_url"],
-            "ollama_model": server_state["ollama_model"],
-            "version": "1.0.0"
-        }
-        
+        uptime = time.monotonic() - start_time
+        # Responses are compact by default; ?pretty=1 indents them for humans
+        pretty = parse_qs(parsed_path.query).get('pretty') == ['1']
         if parsed_path.path == '/health':
-            self._send_json(200, status)
+            if not pretty:
+                self._send_bytes(200, _HEALTH_TEMPLATE % ((uptime, request_counter.value) + _settings_json))
+                return
+            status = {
+                "status": "running",
+                "uptime_seconds": round(uptime, 2),
+                "requests_processed": request_counter.value,
+                "ollama_url": server_state["ollama_url"],
+                "ollama_model": server_state["ollama_model"],
+                "version": "1.0.0"
+            }
+            self._send_json(200, status, pretty=True)
         elif parsed_path.path == '/settings':
-            self._send_json(200, server_state | {"status": "ok"})
+            self._send_json(200, server_state | {"status": "ok"}, pretty=pretty)
         elif parsed_path.path == '/models':
             models = list_ollama_models()
-            self._send_json(200, {"models": models})
+            self._send_json(200, {"models": models}, pretty=pretty)
         else:
-            body = f"""Cluely-Lite Agent Server
-Status: Running
-Uptime: {uptime:.1f} seconds
-Requests: {request_count}
-Ollama: {server_state['ollama_model']} at {server_state['ollama_url']}
-
-Use POST /command with JSON {{"instruction":"<text>","snapshot":[...]}}
-"""
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain; charset=utf-8')
-            self.send_header('Content-Length', str(len(body)))
-            self.end_headers()
-            self.wfile.write(body.encode('utf-8'))
-
-    def _send_json(self, status_code, payload):
-        data = json.dumps(payload, indent=2).encode('utf-8')
+            body = _STATUS_PAGE % ((uptime, request_counter.value) + _settings_text)
+            self._send_bytes(200, body, 'text/plain; charset=utf-8')
+
+    def _read_body(self, length):
+        """Read exactly ``length`` body bytes into a single preallocated buffer."""
+        buf = bytearray(length)
+        pos = 0
+        with memoryview(buf) as view:
+            while pos < length:
+                n = self.rfile.readinto(view[pos:pos + BODY_READ_CHUNK])
+                if not n:
+                    raise OSError(f"connection closed after {pos} of {length} bytes")
+                pos += n
+        return buf
+
+    def _send_json(self, status_code, payload, pretty=False):
+        self._send_bytes(status_code, _dumps(payload, indent=pretty))
+
+    def _send_bytes(self, status_code, data, content_type='application/json; charset=utf-8'):
         self.send_response(status_code)
-        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-type', content_type)
         self.send_header('Content-Length', str(len(data)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
         self.end_headers()
         self.wfile.write(data)
 
@@ -170,56 +321,382 @@ Use POST /command with JSON {{"instruction":"<text>","snapshot":[...]}}
         pass
 
 
-class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+class WorkerPoolMixIn:
+    """Serve connections on a fixed set of daemon worker threads.
+
+    ThreadingMixIn starts a new thread for every connection with no upper
+    bound; here at most ``max_workers`` connections are handled at once and
+    the rest wait until a worker frees up. Once ``max_pending`` are waiting,
+    further connections get an immediate 503 rather than an unbounded wait.
+    """
+    max_workers = MAX_WORKERS
+    max_pending = MAX_PENDING
+    _pending = None
+    _BUSY_RESPONSE = (
+        b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: 27\r\n"
+        b"Retry-After: 1\r\n"
+        b"Connection: close\r\n"
+        b"\r\n"
+        b'{"error":"Server is busy"}\n'
+    )
+
+    def process_request(self, request, client_address):
+        if self._pending is None:
+            self._pending = queue.Queue(self.max_pending)
+            for i in range(self.max_workers):
+                threading.Thread(target=self._serve_pending, name=f"cluely-worker-{i}", daemon=True).start()
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            self._reject(request)
+
+    def _reject(self, request):
+        try:
+            request.sendall(self._BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _serve_pending(self):
+        while True:
+            request, client_address = self._pending.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+class ThreadedTCPServer(WorkerPoolMixIn, socketserver.TCPServer):
     allow_reuse_address = True
-    daemon_threads = True
+    # The default listen(5) backlog drops connections during probe bursts
+    request_queue_size = 128
+
+    def server_bind(self):
+        # Off by default so a second instance still fails with "address in use"
+        if REUSE_PORT and hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
 
+class OllamaConnectionPool:
+    """Keep-alive HTTP connections to the Ollama daemon, shared by handler threads.
 
-def generate_text(prompt, model_override=None):
+    urlopen connects and tears down a TCP connection on every call; this keeps
+    up to ``maxsize`` idle connections per host around for reuse instead.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, timeout=OLLAMA_TIMEOUT, on_line=None):
+        """Send a request and return ``(status, body_bytes)``.
+
+        With ``on_line``, a 200 response body is instead passed to it one line
+        at a time as it arrives and ``body_bytes`` is empty. If ``on_line``
+        returns True the rest of the body is abandoned and the connection is
+        closed rather than reused.
+
+        Raises OSError or http.client.HTTPException on connection problems.
+        """
+        parts = urlsplit(url)
+        try:
+            scheme = parts.scheme or 'http'
+            # Always pass an explicit port: given port=None, http.client would
+            # read the tail of a bare IPv6 host such as "::1" as the port
+            key = (scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80))
+        except ValueError as exc:
+            raise http.client.InvalidURL(f"Invalid Ollama URL {url!r}: {exc}") from None
+        if not parts.hostname:
+            raise http.client.InvalidURL(f"Invalid Ollama URL {url!r}")
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+
+        for attempt in range(2):
+            conn, reused = self._acquire(key, timeout)
+            fed = stopped = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                if on_line is None or resp.status != 200:
+                    data = resp.read()
+                else:
+                    data = b""
+                    for line in iter(resp.readline, b""):
+                        fed = True
+                        if on_line(line):
+                            stopped = True
+                            break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                # An idle keep-alive socket may have been closed by the daemon;
+                # retry once, unless part of the body was already handed out
+                if reused and attempt == 0 and not fed:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if stopped or resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return resp.status, data
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            scheme, host, port = key
+            conn_cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            return conn_cls(host, port, timeout=timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close_idle(self):
+        """Close every idle connection, e.g. after the Ollama URL changes."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+ollama_pool = OllamaConnectionPool()
+
+# Circuit breaker: after BREAKER_THRESHOLD consecutive connection failures,
+# Ollama calls fail fast for BREAKER_COOLDOWN seconds instead of each one
+# waiting out its own connect/read timeout
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 10.0
+OLLAMA_CIRCUIT_OPEN = "Ollama unavailable (too many recent connection errors)"
+_breaker = {"fails": 0, "open_until": 0.0}
+_breaker_lock = threading.Lock()
+
+
+def ollama_circuit_open():
+    """Return True while recent connection failures say Ollama is down."""
+    return time.monotonic() < _breaker["open_until"]
+
+
+def _record_ollama_result(ok):
+    with _breaker_lock:
+        if ok:
+            _breaker["fails"] = 0
+            _breaker["open_until"] = 0.0
+            return
+        # The count is kept after tripping, so one failed probe after the
+        # cool-down reopens the circuit straight away
+        _breaker["fails"] += 1
+        if _breaker["fails"] >= BREAKER_THRESHOLD:
+            _breaker["open_until"] = time.monotonic() + BREAKER_COOLDOWN
+
+
+class ResponseCache:
+    """Thread-safe LRU of recent model replies, keyed by request-body digest.
+
+    The key covers model, prompt and options, so only byte-identical Ollama
+    requests share an entry. Entries expire after ``ttl`` seconds; a ttl of
+    0 disables caching.
+    """
+
+    def __init__(self, maxsize=256, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if now - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL)
+
+
+# Constant part of every generate_text request; only model and prompt vary
+_GENERATE_PAYLOAD = {
+    "stream": True,
+    "keep_alive": OLLAMA_KEEP_ALIVE,
+    "options": {
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "max_tokens": 1024,
+        "num_ctx": 2048
+    }
+}
+# Encoded once; _request_body() splices model and prompt in front of it
+_GENERATE_BODY_TAIL = _dumps(_GENERATE_PAYLOAD)[1:]
+
+
+def _request_body(model, prompt, tail):
+    """Return the JSON request body for model and prompt plus a pre-encoded tail."""
+    return b"".join((b'{"model":', _dumps(model), b',"prompt":', _dumps(prompt), b",", tail))
+
+
+def generate_text(prompt, model_override=None, use_cache=True):
     """Send the raw user prompt to the local model and return full text."""
     model = model_override or server_state["ollama_model"]
     url = server_state["ollama_url"]
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "max_tokens": 1024,
-            "num_ctx": 2048
-        }
-    }
-    data = json.dumps(payload).encode('utf-8')
-    req = request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    data = _request_body(model, prompt, _GENERATE_BODY_TAIL)
+    cache_key = ResponseCache.key(data)
+    if use_cache:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached, None
+    if ollama_circuit_open():
+        return None, OLLAMA_CIRCUIT_OPEN
+    raw, error = _stream_generate(url, data)
+    if error:
+        return None, error
+    response_cache.put(cache_key, raw)
+    return raw, None
+
+
+def _stream_generate(url, data, stop=None):
+    """POST a streaming /api/generate request and return ``(text, error)``.
+
+    The NDJSON ``response`` fragments are joined as they arrive. ``stop``, if
+    given, is called with each fragment and the stream is abandoned as soon
+    as it returns True.
+    """
+    parts = []
+    failure = []
+
+    def on_line(line):
+        if not line.strip():
+            return False
+        try:
+            chunk = _loads(line)
+        except JSON_DECODE_ERRORS as exc:
+            failure.append(f"Ollama response decode error: {exc}")
+            return True
+        if isinstance(chunk, dict) and 'error' in chunk:
+            failure.append(f"Ollama error: {chunk['error']}")
+            return True
+        fragment = chunk.get('response', '') if isinstance(chunk, dict) else None
+        if not isinstance(fragment, str):
+            failure.append("Ollama returned invalid response format")
+            return True
+        parts.append(fragment)
+        return stop is not None and stop(fragment)
+
     try:
-        with request.urlopen(req, timeout=120) as resp:
-            body = resp.read()
-    except (urllib_error.URLError, urllib_error.HTTPError, TimeoutError, socket.timeout) as exc:
+        status, _ = ollama_pool.request('POST', url, body=data, on_line=on_line)
+    except (OSError, http.client.HTTPException) as exc:
+        _record_ollama_result(False)
         return None, f"Ollama connection error: {exc}"
-    try:
-        response_payload = json.loads(body.decode('utf-8'))
-    except json.JSONDecodeError as exc:
-        return None, f"Ollama response decode error: {exc}"
-    raw = response_payload.get('response')
-    if not isinstance(raw, str):
-        return None, "Ollama returned invalid response format"
-    return raw, None
+    _record_ollama_result(True)
+    if status != 200:
+        return None, f"Ollama HTTP error: {status}"
+    if failure:
+        return None, failure[0]
+    return "".join(parts), None
 
 
-def plan_action(instruction, snapshot, model_override=None):
+# Runs of letters; used to compare instruction words with element titles
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+class SnapshotIndex:
+    """Lookups over a snapshot, built in a single pass over its nodes.
+
+    plan_action builds one per request and hands it to heuristic_tool,
+    normalize_tool_with_snapshot and build_prompt, which also still accept
+    a plain list of nodes.
+    """
+
+    def __init__(self, snapshot):
+        self.id_to_title = {}       # first title seen for each id
+        self.titles = []            # non-empty titles in snapshot order
+        self.title_words = []       # letter runs of each title, lowercased
+        self.prompt_nodes = []      # enabled nodes, for the model prompt
+        for node in snapshot:
+            if not isinstance(node, dict):
+                continue
+            title = str(node.get("title", "")).strip()
+            self.id_to_title.setdefault(str(node.get("id")), title)
+            if title:
+                self.titles.append(title)
+                self.title_words.append(frozenset(_WORD_RE.findall(title.lower())))
+            # A disabled element cannot be acted on; do not spend prompt space on it
+            if node.get("enabled", True) is not False:
+                self.prompt_nodes.append(node)
+        self.titles_lower = [title.lower() for title in self.titles]
+        self.title_set = frozenset(self.titles)
+        # Titles the model is shown; the fast path must not act on anything else
+        self.enabled_titles = frozenset(
+            str(node.get("title", "")).strip() for node in self.prompt_nodes
+        ) - {""}
+
+
+def _as_index(snapshot):
+    return snapshot if isinstance(snapshot, SnapshotIndex) else SnapshotIndex(snapshot)
+
+
+def plan_action(instruction, snapshot, model_override=None, use_cache=True):
     """Plan an action based on instruction and screen snapshot."""
+    snapshot = _as_index(snapshot)
+    if not LLM_FIRST:
+        tool = _fast_path_tool(instruction, snapshot)
+        if tool is not None:
+            return {"response": f"Planned: {tool['action']} {tool['target']}", "tool": tool}
+
+    if ollama_circuit_open():
+        # Skip prompt building entirely while Ollama is known to be down
+        return _offline_plan(instruction, snapshot, OLLAMA_CIRCUIT_OPEN)
+
     prompt = build_prompt(instruction, snapshot)
-    tool, tool_error = query_ollama(prompt, model_override=model_override)
+    tool, tool_error = query_ollama(prompt, model_override=model_override, use_cache=use_cache)
     
     if tool is None:
-        logger.warning(f"Ollama query failed: {tool_error}")
-        # Try a lightweight heuristic tool before echo fallback
-        heuristic = heuristic_tool(instruction, snapshot)
-        if heuristic is not None:
-            return {"response": heuristic.get("text") or "Action planned", "tool": heuristic}
-        fallback = fallback_tool(instruction, tool_error)
-        return fallback
+        return _offline_plan(instruction, snapshot, tool_error)
 
     # Normalize tool target to prefer visible titles over opaque ids
     tool = normalize_tool_with_snapshot(tool, snapshot, instruction)
@@ -233,6 +710,34 @@ def plan_action(instruction, snapshot, model_override=None):
     return {"response": response_text, "tool": tool}
 
 
+def _fast_path_tool(instruction, snapshot):
+    """Return the heuristic tool when it needs no model, else None.
+
+    Only plain "click X" / "focus X" commands qualify, and only when X is
+    exactly (ignoring case) the title of a visible, enabled element.
+    """
+    index = _as_index(snapshot)
+    tool = heuristic_tool(instruction, index)
+    if tool is None or tool["action"] not in ("click", "focus"):
+        return None
+    term = instruction.strip().split(" ", 1)[1].strip().strip("\"'")
+    target = str(tool["target"] or "").strip()
+    # Disabled elements are left out of the prompt, so never act on them here either
+    if target and target.lower() == term.lower() and target in index.enabled_titles:
+        return tool
+    return None
+
+
+def _offline_plan(instruction, snapshot, tool_error):
+    """Plan without the model: heuristic tool first, then the echo fallback."""
+    logger.warning("Ollama query failed: %s", tool_error)
+    # Try a lightweight heuristic tool before echo fallback
+    heuristic = heuristic_tool(instruction, snapshot)
+    if heuristic is not None:
+        return {"response": heuristic.get("text") or "Action planned", "tool": heuristic}
+    return fallback_tool(instruction, tool_error)
+
+
 def normalize_tool_with_snapshot(tool, snapshot, instruction):
     """If the tool refers to an element by id or numeric string, map it to a visible title.
     This helps the macOS action layer locate elements by their human-readable labels.
@@ -241,32 +746,20 @@ def normalize_tool_with_snapshot(tool, snapshot, instruction):
         action = (tool.get("action") or "").lower()
         target = tool.get("target")
         if action in {"click", "focus", "type"} and target:
+            index = _as_index(snapshot)
             # If target matches a node id, substitute its title if present
-            for node in snapshot:
-                if str(node.get("id")) == str(target):
-                    title = str(node.get("title", "")).strip()
-                    if title:
-                        tool["target"] = title
-                    break
+            title = index.id_to_title.get(str(target))
+            if title:
+                tool["target"] = title
             # If target not a visible title, try to infer best title from instruction words
-            visible_titles = [str(n.get("title", "")).strip() for n in snapshot if str(n.get("title", "")).strip()]
             tgt = str(tool.get("target") or "").strip()
-            if tgt and tgt not in visible_titles:
-                # Simple heuristic: choose title with highest token overlap with instruction
-                low_ins = (instruction or "").lower()
-                tokens = {t for t in [
-                    *low_ins.replace("\n", " ").split()
-                ] if t.isalpha() and len(t) >= 3}
-                best = None
-                best_score = 0
-                for title in visible_titles:
-                    lt = title.lower()
-                    score = sum(1 for w in tokens if w in lt)
-                    if score > best_score:
-                        best_score = score
-                        best = title
-                if best and best_score > 0:
-                    tool["target"] = best
+            if tgt and tgt not in index.title_set:
+                # Simple heuristic: choose title with highest word overlap with instruction
+                tokens = frozenset(w for w in _WORD_RE.findall((instruction or "").lower()) if len(w) >= 3)
+                if tokens and index.titles:
+                    best, words = max(zip(index.titles, index.title_words), key=lambda pair: len(tokens & pair[1]))
+                    if tokens & words:
+                        tool["target"] = best
     except Exception:
         pass
     return tool
@@ -287,169 +780,280 @@ def fallback_tool(instruction, detail=None):
     }
 
 
+# Patterns and verb prefixes for heuristic_tool, compiled once
+_QUOTED_RE = re.compile(r'"([^"]+)"|\'([^\']+)\'')
+_INTO_RE = re.compile(r"(?:into|in)\s+(.+)$")
+_CLICK_PREFIXES = ("click ", "press ")
+_FOCUS_PREFIXES = ("focus ",)
+_TYPE_PREFIXES = ("type ", "enter ", "input ")
+_HELP_PHRASES = ("what's on my screen", "what is on my screen", "help", "how do i")
+
+
 def heuristic_tool(instruction, snapshot):
     """Very small rule-based planner for offline/basic commands.
     Attempts to extract a sensible tool from the instruction alone.
     """
+    index = _as_index(snapshot)
     ins = instruction.strip()
     low = ins.lower()
 
     def first_title_matching(term):
         t = term.lower()
-        for node in snapshot:
-            title = str(node.get("title", "")).lower()
-            if t and title and (t in title or title in t):
-                return node.get("title")
+        if t:
+            for title, title_low in zip(index.titles, index.titles_lower):
+                if t in title_low or title_low in t:
+                    return title
         return term
 
     # Click patterns
-    if low.startswith(("click ", "press ")):
+    if low.startswith(_CLICK_PREFIXES):
         target = ins.split(" ", 1)[1].strip()
         target = target.strip("\"'")
         return {"action": "click", "target": first_title_matching(target), "text": ""}
 
     # Focus patterns
-    if low.startswith("focus "):
+    if low.startswith(_FOCUS_PREFIXES):
         target = ins.split(" ", 1)[1].strip()
         target = target.strip("\"'")
         return {"action": "focus", "target": first_title_matching(target), "text": ""}
 
     # Type patterns
-    if low.startswith(("type ", "enter ", "input ")):
+    if low.startswith(_TYPE_PREFIXES):
         # Extract quoted text if present
-        import re
-        m = re.search(r'"([^"]+)"|\'([^\']+)\'', ins)
+        m = _QUOTED_RE.search(ins)
         text_value = m.group(1) if m and m.group(1) else (m.group(2) if m else None)
         # Try to infer target after into/in
         target = None
-        m2 = re.search(r"(?:into|in)\s+(.+)$", low)
+        m2 = _INTO_RE.search(low)
         if m2:
             target = ins[m2.start(1):].strip()
         return {"action": "type", "target": first_title_matching(target or ""), "text": text_value or ins.split(" ", 1)[1].strip()}
 
     # Simple Q&A
-    if any(q in low for q in ["what's on my screen", "what is on my screen", "help", "how do i"]):
+    if any(q in low for q in _HELP_PHRASES):
         return {"action": "answer", "target": None, "text": "I can click, type, focus, or answer based on the visible UI. Try: 'Click Save', 'Type \"Hello\" into Search', or 'Focus password'."}
 
     return None
 
 
-def build_prompt(instruction, snapshot):
-    """Build a prompt for the AI model."""
-    # Truncate snapshot to avoid token limits
-    truncated_snapshot = snapshot[:120]
-    snapshot_text = json.dumps(truncated_snapshot, ensure_ascii=False, indent=2)
-    if len(snapshot_text) > 60000:
-        snapshot_text = snapshot_text[:60000] + "\n... (truncated)"
-    
-    schema = textwrap.dedent("""
-        Respond with a single JSON object matching this schema, using DOUBLE QUOTES for all keys/values and NO extra text:
-        {
-            "action": "answer|click|type|focus",
-            "target": "string (element identifier)",
-            "text": "string (optional, for type actions)"
-        }
-        
-        Available actions:
-        - answer: Provide a direct, helpful response without taking UI action
-        - click: Click on an element (use target text or identifier)
-        - type: Type text into an element (use target and text)
-        - focus: Move the focus/caret to an element (use target)
-    """).strip()
-    
-    guidance = textwrap.dedent("""
-        Guidelines:
-        - If the requested action seems unsafe or destructive, choose action "answer" and explain that confirmation is needed.
-        - Always use the element TITLE as the "target" (not internal ids). Prefer exact titles from the snapshot.
-        - When snapshot is empty, still select the best action based on the instruction.
-        - Output ONLY the JSON object. No code fences, prose, or markdown.
-        - For "answer", set "target" to null and put the reply in "text".
-    """).strip()
-    
-    return f"""You are Cluely-Lite, a focused local desktop agent.
+# Static prompt sections
+_SCHEMA = """\
+Respond with a single JSON object matching this schema, using DOUBLE QUOTES for all keys/values and NO extra text:
+{
+    "action": "answer|click|type|focus",
+    "target": "string (element identifier)",
+    "text": "string (optional, for type actions)"
+}
 
-Instruction: {instruction}
+Available actions:
+- answer: Provide a direct, helpful response without taking UI action
+- click: Click on an element (use target text or identifier)
+- type: Type text into an element (use target and text)
+- focus: Move the focus/caret to an element (use target)"""
 
-Current screen elements (may be empty if snapshot unavailable):
-{snapshot_text}
+_GUIDANCE = """\
+Guidelines:
+- If the requested action seems unsafe or destructive, choose action "answer" and explain that confirmation is needed.
+- Always use the element TITLE as the "target" (not internal ids). Prefer exact titles from the snapshot.
+- When snapshot is empty, still select the best action based on the instruction.
+- Output ONLY the JSON object. No code fences, prose, or markdown.
+- For "answer", set "target" to null and put the reply in "text".
+- Screen elements are a table: each entry in "rows" holds one element's values in "cols" order, and "frame" is [x, y, width, height]."""
 
-{schema}
+# Sent as the "system" field of every planning request. Keeping it identical
+# across calls lets Ollama reuse the already-evaluated prefix.
+_SYSTEM_PROMPT = f"You are Cluely-Lite, a focused local desktop agent.\n\n{_SCHEMA}\n\n{_GUIDANCE}"
 
-{guidance}
+# build_prompt() only splices the instruction and snapshot between these
+_PROMPT_HEAD = "Instruction: "
+_PROMPT_MID = "\n\nCurrent screen elements (may be empty if snapshot unavailable):\n"
+_PROMPT_TAIL = "\n\nDecide on the best action and return only the JSON object."
 
-Decide on the best action and return only the JSON object."""
 
+# Snapshot columns sent to the model; keys are written once instead of per node
+SNAPSHOT_COLUMNS = ("id", "role", "title", "frame")
+_SNAPSHOT_HEAD = b'{"cols":' + _dumps(list(SNAPSHOT_COLUMNS)) + b',"rows":['
 
-def query_ollama(prompt, model_override=None):
+
+def _snapshot_row(node):
+    """Return a node's values in SNAPSHOT_COLUMNS order, frame as [x, y, w, h]."""
+    frame = node.get("frame")
+    if isinstance(frame, dict):
+        try:
+            frame = [round(frame[k]) for k in ("x", "y", "w", "h")]
+        except (KeyError, TypeError, ValueError, OverflowError):
+            frame = None
+    return [node.get("id"), node.get("role"), node.get("title"), frame]
+
+
+def snapshot_json(snapshot):
+    """Serialize snapshot nodes as a ``{"cols": [...], "rows": [...]}`` table.
+
+    Disabled nodes are skipped, and rows are encoded one per line until the
+    next would exceed MAX_SNAPSHOT_BYTES, so oversized snapshots are never
+    fully serialized just to be sliced afterwards.
+    """
+    nodes = _as_index(snapshot).prompt_nodes
+    out = bytearray(_SNAPSHOT_HEAD)
+    empty = len(out)
+    truncated = False
+    for node in nodes[:MAX_SNAPSHOT_NODES]:
+        item = _dumps(_snapshot_row(node))
+        # Reserve room for the separator and the closing brackets
+        if len(out) + len(item) + 5 > MAX_SNAPSHOT_BYTES:
+            truncated = True
+            break
+        out += b",\n" if len(out) > empty else b"\n"
+        out += item
+    out += b"\n]}" if len(out) > empty else b"]}"
+    text = out.decode('utf-8')
+    if truncated:
+        text += "\n... (truncated)"
+    return text
+
+
+def build_prompt(instruction, snapshot):
+    """Build the per-request part of the planning prompt (see _SYSTEM_PROMPT)."""
+    return "".join((_PROMPT_HEAD, instruction, _PROMPT_MID, snapshot_json(snapshot), _PROMPT_TAIL))
+
+
+# Constant part of every planning request; only model and prompt vary, and
+# the system prompt stays byte-identical so its evaluated prefix is reused
+_PLAN_PAYLOAD = {
+    "stream": True,
+    "keep_alive": OLLAMA_KEEP_ALIVE,
+    "system": _SYSTEM_PROMPT,
+    "options": {
+        "temperature": 0.2,  # Low for consistency on small models
+        "top_p": 0.8,
+        "max_tokens": 400,
+        "num_ctx": 2048
+    },
+    "format": "json"
+}
+_PLAN_BODY_TAIL = _dumps(_PLAN_PAYLOAD)[1:]
+
+
+def query_ollama(prompt, model_override=None, use_cache=True):
     """Query the Ollama API for action planning."""
     model = model_override or server_state["ollama_model"]
     url = server_state["ollama_url"]
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.2,  # Low for consistency on small models
-            "top_p": 0.8,
-            "max_tokens": 400,
-            "num_ctx": 2048
-        },
-        "format": "json"
-    }
-    
-    data = json.dumps(payload).encode('utf-8')
-    req = request.Request(url, data=data, headers={'Content-Type': 'application/json'})
-    
-    try:
-        with request.urlopen(req, timeout=120) as resp:
-            body = resp.read()
-    except (urllib_error.URLError, urllib_error.HTTPError, TimeoutError, socket.timeout) as exc:
-        return None, f"Ollama connection error: {exc}"
-
-    try:
-        response_payload = json.loads(body.decode('utf-8'))
-    except json.JSONDecodeError as exc:
-        return None, f"Ollama response decode error: {exc}"
-
-    raw = response_payload.get('response')
-    if not isinstance(raw, str):
-        return None, "Ollama returned invalid response format"
+    data = _request_body(model, prompt, _PLAN_BODY_TAIL)
+    cache_key = ResponseCache.key(data)
+    if use_cache:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            # Callers normalize the tool in place; hand out a copy
+            return dict(cached), None
+    if ollama_circuit_open():
+        return None, OLLAMA_CIRCUIT_OPEN
+
+    # Stop reading once the tool object is complete; anything the model
+    # generates after it is discarded by parse_tool_json anyway. any() leaves
+    # a feed() unfinished only when it returns True, and then nothing follows.
+    scanner = _JsonObjectScanner()
+    raw, error = _stream_generate(
+        url, data, stop=lambda fragment: any(depth == 0 for depth, _ in scanner.feed(fragment))
+    )
+    if error:
+        return None, error
 
     tool = parse_tool_json(raw)
     if tool is None:
         return None, "Failed to parse valid tool JSON from Ollama response"
 
+    response_cache.put(cache_key, dict(tool))
     return tool, None
 
 
+class _JsonObjectScanner:
+    """Find balanced ``{...}`` blocks in text that may arrive in pieces.
+
+    feed() yields ``(depth, block)`` for each block that closes within the
+    fragment, so nested objects come before the object that contains them;
+    ``depth`` is 0 for top-level blocks. Quoted strings (with escapes) are
+    tracked inside objects so braces in values do not count, while
+    apostrophes in the surrounding prose are ignored. State carries over
+    between fragments as long as each feed() is consumed to the end.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._starts = []
+        self._quote = None
+        self._escaped = False
+
+    def feed(self, fragment):
+        offset = len(self.text)
+        self.text += fragment
+        text = self.text
+        starts = self._starts
+        for i in range(offset, len(text)):
+            ch = text[i]
+            if self._quote:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch == '{':
+                starts.append(i)
+            elif not starts:
+                continue
+            elif ch == '"' or ch == "'":
+                self._quote = ch
+            elif ch == '}':
+                begin = starts.pop()
+                yield len(starts), text[begin:i + 1]
+
+
+def _scan_json_objects(text):
+    """Yield ``(depth, block)`` for every balanced ``{...}`` block in text."""
+    return _JsonObjectScanner().feed(text)
+
+
+def extract_json_object(text):
+    """Return the first top-level balanced ``{...}`` block in text, or None."""
+    for depth, block in _scan_json_objects(text):
+        if depth == 0:
+            return block
+    return None
+
+
+def _load_tool(candidate):
+    """Decode a candidate string and return it if it is a valid tool, else None."""
+    try:
+        obj = _loads(candidate)
+    except JSON_DECODE_ERRORS:
+        return None
+    return obj if validate_tool(obj) else None
+
+
 def parse_tool_json(text):
     """Parse and validate tool JSON from AI response."""
-    # Try multiple parsing strategies
-    candidates = [text.strip()]
-    
-    # Extract JSON from text if it's embedded
-    if '{' in text and '}' in text:
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        if start < end:
-            candidates.append(text[start:end])
-    
-    # Try with single quotes converted to double quotes
-    candidates.append(text.replace("'", '"'))
-    
-    # Try to find JSON objects in the text
-    import re
-    json_matches = re.findall(r'\{[^{}]*\}', text)
-    candidates.extend(json_matches)
+    # With "format": "json" the reply is normally a bare object
+    tool = _load_tool(text.strip())
+    if tool is not None:
+        return tool
+
+    # Otherwise pull the first balanced object out of the surrounding prose
+    candidate = extract_json_object(text)
+    if candidate is not None:
+        tool = _load_tool(candidate)
+        if tool is None and "'" in candidate:
+            # Small models sometimes answer with single-quoted pseudo-JSON
+            tool = _load_tool(candidate.replace("'", '"'))
+        if tool is not None:
+            return tool
+
+    # Last resort: any other object, e.g. a tool nested inside a wrapper object
+    for _, block in _scan_json_objects(text):
+        if block != candidate:
+            tool = _load_tool(block)
+            if tool is not None:
+                return tool
 
-    for candidate in candidates:
-        try:
-            obj = json.loads(candidate)
-            if validate_tool(obj):
-                return obj
-        except json.JSONDecodeError:
-            continue
-    
     return None
 
 
@@ -469,41 +1073,73 @@ def validate_tool(obj):
     # Normalize the action
     obj['action'] = action
     
-    # Ensure target and text are strings or None
-    if 'target' in obj and obj['target'] is not None:
-        obj['target'] = str(obj['target'])
-    else:
-        obj['target'] = None
-        
-    if 'text' in obj and obj['text'] is not None:
-        obj['text'] = str(obj['text'])
-    else:
-        obj['text'] = ''
-    
+    # Ensure target is a string or None and text is a string
+    target = obj.get('target')
+    obj['target'] = None if target is None else str(target)
+    text = obj.get('text')
+    obj['text'] = '' if text is None else str(text)
+
     return True
 
 
+# /api/tags results are reused for this many seconds; the model list rarely
+# changes and UIs poll /models. Entries are (monotonic time, url, value).
+_TAGS_TTL = 10.0
+_availability_cache = None
+_models_cache = None
+
+
+def _cached_probe(entry, url):
+    if entry is not None and entry[1] == url and time.monotonic() - entry[0] < _TAGS_TTL:
+        return entry
+    return None
+
+
+def invalidate_ollama_probes():
+    """Forget cached availability and model lists (e.g. after a URL change)."""
+    global _availability_cache, _models_cache
+    _availability_cache = None
+    _models_cache = None
+
+
 def check_ollama_availability():
     """Check if Ollama is running and accessible."""
+    global _availability_cache
+    url = server_state["ollama_url"]
+    hit = _cached_probe(_availability_cache, url)
+    if hit is not None:
+        return hit[2]
     try:
-        req = request.Request(server_state["ollama_url"].replace('/api/generate', '/api/tags'))
-        with request.urlopen(req, timeout=5) as resp:
-            return resp.status == 200
-    except:
-        return False
+        status, _ = ollama_pool.request('GET', url.replace('/api/generate', '/api/tags'), timeout=5)
+        available = status == 200
+    except (OSError, http.client.HTTPException):
+        available = False
+    _availability_cache = (time.monotonic(), url, available)
+    return available
 
 
 def list_ollama_models():
     """Return a list of model names available in the local Ollama daemon."""
+    global _models_cache, _availability_cache
+    url = server_state["ollama_url"]
+    hit = _cached_probe(_models_cache, url)
+    if hit is not None:
+        return list(hit[2])
+    models = []
     try:
-        req = request.Request(server_state["ollama_url"].replace('/api/generate', '/api/tags'))
-        with request.urlopen(req, timeout=5) as resp:
-            body = json.loads(resp.read().decode('utf-8'))
+        status, data = ollama_pool.request('GET', url.replace('/api/generate', '/api/tags'), timeout=5)
+        if status != 200:
+            logger.debug("Failed to list models: HTTP %s", status)
+        else:
+            body = _loads(data)
             models = [m.get('name') for m in body.get('models', []) if m.get('name')]
-            return models
+            # Only a successful listing is cached, so a failure is retried next call
+            now = time.monotonic()
+            _models_cache = (now, url, models)
+            _availability_cache = (now, url, True)
     except Exception as e:
-        logger.debug(f"Failed to list models: {e}")
-        return []
+        logger.debug("Failed to list models: %s", e)
+    return list(models)
 
 
 def main():
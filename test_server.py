@@ -4,6 +4,9 @@ Test script for Cluely-Lite Python server
 """
 
 import json
+import http.client
+import os
+import sys
 import urllib.request
 import urllib.error
 import time
@@ -111,7 +114,25 @@ def test_server():
         print(f"❌ Error handling test failed: {e}")
         return False
     
-    # Test 5: Performance test
+    # Test 5: Oversized payloads are rejected before the body is read
+    print("\n4. Testing payload size limit...")
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", 8765, timeout=5)
+        conn.putrequest("POST", "/command")
+        conn.putheader("Content-Type", "application/json")
+        conn.putheader("Content-Length", str(64 * 1024 * 1024))
+        conn.endheaders()
+        response = conn.getresponse()
+        if response.status == 413:
+            print("✅ Oversized payload rejected (413 Payload Too Large)")
+        else:
+            print(f"⚠️  Expected 413 but got: {response.status}")
+        conn.close()
+    except Exception as e:
+        print(f"❌ Payload size limit test failed: {e}")
+        return False
+    
+    # Test 6: Performance test
     print("\n5. Testing performance...")
     start_time = time.time()
     
@@ -136,6 +157,23 @@ def test_server():
     print("\n🎉 All tests passed!")
     return True
 
+def test_fast_path():
+    """Check the model-free planner shortcut without a running server."""
+    print("\n🔍 Checking heuristic fast path...")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python", "src"))
+    import server
+
+    enabled = [{"id": "1", "title": "Save", "enabled": True}]
+    disabled = [{"id": "1", "title": "Save", "enabled": False}]
+    if server._fast_path_tool("click Save", enabled) is None:
+        print("❌ Exact click on an enabled element should skip the model")
+        return False
+    if server._fast_path_tool("click Save", disabled) is not None:
+        print("❌ Fast path acted on a disabled element")
+        return False
+    print("✅ Fast path only acts on enabled elements")
+    return True
+
 def check_ollama():
     """Check if Ollama is running and has the required model."""
     print("\n🔍 Checking Ollama status...")
@@ -168,6 +206,9 @@ if __name__ == "__main__":
     print("Cluely-Lite Server Test")
     print("======================")
     
+    if not test_fast_path():
+        sys.exit(1)
+
     # Check Ollama first
     if not check_ollama():
         print("\n⚠️  Ollama issues detected, but continuing with tests...")